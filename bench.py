@@ -0,0 +1,266 @@
+# bench.py
+# Benchmarks for the game algorithms, with saved baselines to compare against.
+# Run from the repository root, so wordle can find its word lists.
+
+import argparse, copy, json, platform, random, statistics, sys, time, tracemalloc
+
+import mancala, tictactoe, wordle
+from stats import SearchStats
+
+SEED = 0
+
+# Slowdowns smaller than this many seconds are never counted as regressions.
+MIN_REGRESSION = 0.001
+
+
+def empty_tictactoe_board():
+
+    """Create an empty tic-tac-toe board. Board() shares its default list
+       between boards, so it can't be used here."""
+
+    return tictactoe.Board([[None, None, None] for _ in range(3)])
+
+
+def clone_solver(solver):
+
+    """Copy a solver, including its guess history (which deepcopy drops)."""
+
+    s = copy.deepcopy(solver)
+    s.starting_word = solver.starting_word
+    s.next_word = solver.next_word
+    s.my_words = solver.my_words
+    s.num_guesses = solver.num_guesses
+    s.guesses = solver.guesses[:]
+    return s
+
+
+def solver_after(word, turns):
+
+    """Play 'turns' solver guesses against a word, returning the solver."""
+
+    s = wordle.Solver()
+    g = wordle.Game(word)
+    for _ in range(turns):
+        guess = s.calculate_guess()
+        s.calculate_constraints(guess, g.guess(guess))
+    return s
+
+
+def bench_wordle_turn(turn):
+
+    """Benchmark Solver.calculate_guess at a turn of a fixed game."""
+
+    word = random.Random(SEED).choice(wordle.WORDLE_ANSWERS)
+    solver = solver_after(word, turn - 1)
+
+    def prepare():
+        return clone_solver(solver)
+
+    def run(s, stats=None):
+        s.stats = stats
+        s.calculate_guess()
+
+    return prepare, run
+
+
+def bench_wordle_game_guess():
+
+    """Benchmark Game.guess over a fixed set of words and guesses."""
+
+    rnd = random.Random(SEED)
+    pairs = [(wordle.Game(rnd.choice(wordle.WORDLE_ANSWERS)), rnd.choice(wordle.WORDLE_WORDS)) \
+            for _ in range(20000)]
+
+    def run(_, stats=None):
+        for game, guess in pairs:
+            game.guess(guess)
+
+    return None, run
+
+
+def bench_tictactoe(moves):
+
+    """Benchmark Computer.calculate_move after some moves have been played."""
+
+    def prepare():
+        board = empty_tictactoe_board()
+        for pos, player in moves:
+            board.set(pos, player)
+        return board
+
+    def run(board, stats=None):
+        tictactoe.Computer('O', 'X', stats=stats).calculate_move(board)
+
+    return prepare, run
+
+
+def bench_mancala(limit, max_extra_turns=2):
+
+    """Benchmark Computer.calculate_scores (calculate() without its debug
+       print) from a fixed board."""
+
+    board = mancala.Board()
+    rnd = random.Random(SEED)
+    for turn in 'abab':
+        board.move(rnd.choice([i for i, h in enumerate(board.holes) if h]), turn)
+
+    def prepare():
+        return board.dup()
+
+    def run(b, stats=None):
+        mancala.Computer('a', max_extra_turns=max_extra_turns, stats=stats) \
+                .calculate_scores(b, limit)
+
+    return prepare, run
+
+
+# Each benchmark is a name, the function that sets it up and the number of
+# timed repeats. The solver's first guess is a fixed word, so its turns start
+# from the second.
+BENCHMARKS = [
+    ('wordle.calculate_guess.turn2', lambda: bench_wordle_turn(2), 20),
+    ('wordle.calculate_guess.turn3', lambda: bench_wordle_turn(3), 5),
+    ('wordle.calculate_guess.turn4', lambda: bench_wordle_turn(4), 5),
+    ('wordle.game_guess.20k', bench_wordle_game_guess, 5),
+    ('tictactoe.calculate_move.empty', lambda: bench_tictactoe([]), 3),
+    ('tictactoe.calculate_move.midgame', lambda: bench_tictactoe( \
+            [((1, 1), 'X'), ((0, 0), 'O'), ((0, 2), 'X')]), 10),
+    ('mancala.calculate.limit1', lambda: bench_mancala(1), 20),
+    ('mancala.calculate.limit2', lambda: bench_mancala(2), 5),
+    ('mancala.calculate.limit3', lambda: bench_mancala(3), 5),
+]
+
+
+def percentile(values, p):
+
+    """Get the p-th percentile of a list of values."""
+
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def run_benchmark(setup, repeat):
+
+    """Run a benchmark, returning its timings, search statistics and peak
+       memory."""
+
+    prepare, run = setup()
+    prepare = prepare or (lambda: None)
+
+    # Time the runs.
+    times = []
+    for _ in range(repeat):
+        state = prepare()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    # Collect the search statistics in a separate run, so they don't affect
+    # the timing.
+    stats = SearchStats()
+    run(prepare(), stats)
+    totals = stats.totals()
+
+    # Measure the peak memory in another run.
+    state = prepare()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'repeat': repeat,
+        'median': statistics.median(times),
+        'p10': percentile(times, 10),
+        'p90': percentile(times, 90),
+        'min': min(times),
+        'max': max(times),
+        'nodes': totals['nodes'],
+        'simulations': totals['simulations'],
+        'cache_hits': totals['cache_hits'],
+        'peak_memory': peak,
+    }
+
+
+def run_all(only=None, repeat=None):
+
+    """Run the benchmarks whose name contains 'only', returning the results."""
+
+    results = {}
+    for name, setup, default_repeat in BENCHMARKS:
+        if only and only not in name:
+            continue
+        results[name] = run_benchmark(setup, repeat or default_repeat)
+        r = results[name]
+        print(f"{name:<36} median {r['median'] * 1000:>10.2f} ms  "
+              f"p90 {r['p90'] * 1000:>10.2f} ms  nodes {r['nodes'] + r['simulations']:>8}  "
+              f"peak {r['peak_memory'] / 1024:>8.0f} KiB", flush=True)
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'benchmarks': results,
+    }
+
+
+def compare(baseline, current, threshold):
+
+    """Compare results to a baseline, returning the names of the benchmarks
+       which regressed. Timings are noisy, so a benchmark only regresses if
+       its fastest run is slower than the baseline's p90 by more than
+       'threshold' (a fraction) and by more than MIN_REGRESSION seconds. The
+       change in the median is printed for reference."""
+
+    regressions = []
+    for name, r in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            print(f'{name:<36} (no baseline)')
+            continue
+
+        base = baseline['benchmarks'][name]
+        change = r['median'] / base['median'] - 1
+        flag = ''
+        if r['min'] > base['p90'] * (1 + threshold) and \
+                r['min'] - base['p90'] > MIN_REGRESSION:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print(f'{name:<36} {base["median"] * 1000:>10.2f} ms -> '
+              f'{r["median"] * 1000:>10.2f} ms ({change:+.1%}, '
+              f'min vs p90 {r["min"] / base["p90"] - 1:+.1%}) {flag}')
+        for counter in ('nodes', 'simulations'):
+            if r.get(counter) != base.get(counter):
+                print(f'{"":<36} {counter} {base.get(counter)} -> {r.get(counter)}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the game algorithms.')
+    parser.add_argument('--only', default=None, help='only run benchmarks containing this')
+    parser.add_argument('--repeat', type=int, default=None, help='override the repeat counts')
+    parser.add_argument('--output', default=None, help='save the results as a baseline')
+    parser.add_argument('--compare', default=None, help='compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.1, \
+            help='slowdown over the baseline p90 counted as a regression (default 0.1, '
+            'i.e. 10%%)')
+    args = parser.parse_args()
+
+    current = run_all(args.only, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) above {args.threshold:.0%}.')
+            sys.exit(1)
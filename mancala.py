@@ -1,6 +1,10 @@
 # mancala.py
 # Mancala game and algorithm.
 
+import threading
+
+from search import Search, TimeUp
+
 class Board:
     
     """The mancala board."""
@@ -71,77 +75,151 @@ class Board:
         return Board(self.a, self.b, self.holes[:])
 
 
+class State:
+
+    """A board and the player to move, for searching with search.Search."""
+
+    def __init__(self, board, to_move, max_extra_turns=None):
+
+        """Create the state. The board is changed while it is searched."""
+
+        self.board = board
+        self.to_move = to_move
+        self.extra = 0
+        self.max_extra_turns = max_extra_turns
+
+    def moves(self):
+
+        """Find all moves."""
+
+        return [move for move, hole in enumerate(self.board.holes) if hole]
+
+    def order(self, moves):
+
+        """Order moves, with moves whose last bead lands in the player's
+           store (an extra turn) first."""
+
+        store_hole = 11 if self.to_move == 'a' else 5
+        holes = self.board.holes
+        return sorted(moves, key=lambda move: holes[move] != (store_hole - move) % 12 + 1)
+
+    def make(self, move):
+
+        """Make a move, returning what is needed to undo it."""
+
+        board = self.board
+        undo = (board.a, board.b, board.holes[:], self.to_move, self.extra)
+        if board.move(move, self.to_move):
+            self.extra += 1
+        else:
+            self.to_move = 'b' if self.to_move == 'a' else 'a'
+            self.extra = 0
+        return undo
+
+    def unmake(self, move, undo):
+
+        """Undo a move."""
+
+        self.board.a, self.board.b, self.board.holes, self.to_move, self.extra = undo
+
+    def side(self):
+
+        """Get the player to move."""
+
+        return self.to_move
+
+    def key(self):
+
+        """Get a key for the state."""
+
+        extra = self.extra if self.max_extra_turns is not None else 0
+        return (self.board.a, self.board.b, tuple(self.board.holes), self.to_move, extra)
+
+    def evaluate(self):
+
+        """Get the score for the player to move."""
+
+        if self.to_move == 'a':
+            return self.board.a - self.board.b
+        else:
+            return self.board.b - self.board.a
+
+    def terminal(self):
+
+        """Check if the search should stop here, after too many extra turns."""
+
+        return self.max_extra_turns is not None and self.extra > self.max_extra_turns
+
+
+# The CLI's search cache is cleared once it gets this big.
+MAX_CACHE_SIZE = 100000
+
+
 class Computer:
 
     """The mancala algorithm."""
 
-    def __init__(self, player):
+    def __init__(self, player, cache=None, max_extra_turns=None, stats=None):
 
         """Create the computer. 'player' determines the player the computer
-           should calculate for, can be 'a' or 'b'."""
+           should calculate for, can be 'a' or 'b'. If 'cache' is a dict, it
+           is used as the search's transposition table and reused by later
+           searches. 'max_extra_turns' limits how many extra turns in a row
+           are searched, after which the board is scored as it stands. If
+           'stats' is a SearchStats, each search fills it in."""
 
         self.player = player
+        self.cache = cache
+        self.max_extra_turns = max_extra_turns
+        self.stats = stats
+
+        # The depth the last best_move() search finished.
+        self.last_depth = None
 
     def calculate(self, board, limit=2):
 
         """Calculate a move, given a board."""
 
-        # Keep track of the final minimax scores.
-        scores = {}
-
-        # Check each possible move.
-        for move in self.find_all_moves(board):
-            # Make the move.
-            current_board = board.dup()
-            if not current_board.move(move, self.player):
-                # Evaluate the new board.
-                scores[move] = self.evaluate(current_board, 'b' if self.player == 'a' else 'a', \
-                        0, limit)
-            else:
-                # We get to go again. Evaluate the new board.
-                scores[move] = self.evaluate(current_board, self.player, 0, limit)
+        scores = self.calculate_scores(board, limit)
 
         print(scores)
         return max(scores.items(), key=lambda x: x[1])[0]
 
-    def evaluate(self, board, to_move, depth, limit):
-
-        """Evaluate a board, returning the final score."""
-
-        # If we hit the limit, get the final scores.
-        if depth == limit:
-            if self.player == 'a':
-                return board.a - board.b
-            else:
-                return board.b - board.a
-
-        # Keep track of the final minimax scores.
-        scores = {}
-
-        # Check each possible move.
-        for move in self.find_all_moves(board):
-            # Make the move.
-            current_board = board.dup()
-            if not current_board.move(move, to_move):
-                # Evaluate the new board.
-                scores[move] = self.evaluate(current_board, 'b' if to_move == 'a' else 'a', \
-                        depth+1, limit)
-            else:
-                # We get to go again. Evaluate the new board.
-                scores[move] = self.evaluate(current_board, to_move, depth, limit)
-    
-        # If we run out of moves, return.
-        if scores == {}:
-            if self.player == 'a':
-                return board.a - board.b
-            else:
-                return board.b - board.a
-
-        # If we are evaluating for the opponent, pick the best score for them.
-        if to_move != self.player:
-            return min(scores.values())
-        else:
-            return max(scores.values())
+    def calculate_scores(self, board, limit=2, stop_event=None):
+
+        """Calculate the minimax score of each move, given a board. If
+           'stop_event' is a threading.Event, setting it stops the search,
+           which then raises search.TimeUp."""
+
+        if self.stats is not None:
+            self.stats.begin('mancala.minimax')
+
+        try:
+            state = State(board.dup(), self.player, self.max_extra_turns)
+            return Search(self.cache, self.stats, stop_event).root_scores(state, limit)
+        finally:
+            if self.stats is not None:
+                self.stats.end()
+
+    def best_move(self, board, limit=2, time_limit=None):
+
+        """Find the best move, given a board, without scoring every move.
+           Searches deeper one step at a time up to 'limit', stopping early
+           once 'time_limit' seconds have passed. The depth it finished is
+           kept in 'last_depth'."""
+
+        if self.stats is not None:
+            self.stats.begin('mancala.minimax')
+
+        try:
+            state = State(board.dup(), self.player, self.max_extra_turns)
+            search = Search(self.cache, self.stats)
+            move, score = search.best_move(state, limit, time_limit)
+            self.last_depth = search.finished_depth
+            return move
+        finally:
+            if self.stats is not None:
+                self.stats.end()
 
     def find_all_moves(self, board):
 
@@ -152,6 +230,64 @@ class Computer:
         return list(moves)
 
 
+class Ponderer:
+
+    """Searches the opponent's replies in the background, filling the
+       computer's cache while the opponent is thinking."""
+
+    def __init__(self, computer, limit=2):
+
+        """Create the ponderer. 'computer' must have a cache to fill."""
+
+        if computer.cache is None:
+            raise ValueError('the computer needs a cache to ponder into')
+
+        self.computer = computer
+        self.limit = limit
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self, board, turn):
+
+        """Start pondering the replies 'turn' can make on a board."""
+
+        self.stop()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.ponder, \
+                args=(board.dup(), turn, self.stop_event), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+
+        """Stop pondering, interrupting the current search."""
+
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def ponder(self, board, turn, stop_event):
+
+        """Search the board after each reply, most likely replies first."""
+
+        # Guess that the opponent prefers replies which gain them the most.
+        replies = []
+        for move in self.computer.find_all_moves(board):
+            reply_board = board.dup()
+            reply_board.move(move, turn)
+            gain = reply_board.a - board.a if turn == 'a' else reply_board.b - board.b
+            replies.append((gain, move, reply_board))
+        replies.sort(key=lambda x: x[0], reverse=True)
+
+        for gain, move, reply_board in replies:
+            if stop_event.is_set():
+                return
+            try:
+                self.computer.calculate_scores(reply_board, self.limit, stop_event)
+            except TimeUp:
+                return
+
+
 def print_board(b):
 
     """Print out a board."""
@@ -167,21 +303,35 @@ def print_board(b):
 
 if __name__ == '__main__':
     b = Board()
-    c = Computer('a')
+    c = Computer('a', cache={}, max_extra_turns=2)
+    p = Ponderer(c)
     
-    while True:
-        print_board(b)
-
-        # Make the computer move.
-        print("Thinking...")
-        computer_move = c.calculate(b)
-        print("Computer has moved!")
-        b.move(computer_move, 'a')
-
-        print_board(b)
-
-        # Make the player move.
-        guess = input("Player move (1 - 12): ")
-        while not guess.isdecimal():
-            guess = input("Enter a valid move. Player move (1 - 12): ")
-        b.move(int(guess)-1, 'b')
+    try:
+        while True:
+            print_board(b)
+
+            # Make the computer move.
+            print("Thinking...")
+            computer_move = c.calculate(b)
+            print("Computer has moved!")
+            b.move(computer_move, 'a')
+
+            print_board(b)
+
+            # Ponder while the player is thinking. The cache is cleared here
+            # if it has got too big, so the pondered results are kept for
+            # the next move.
+            if len(c.cache) > MAX_CACHE_SIZE:
+                c.cache.clear()
+            p.start(b, 'b')
+
+            # Make the player move.
+            guess = input("Player move (1 - 12): ")
+            while not guess.isdecimal():
+                guess = input("Enter a valid move. Player move (1 - 12): ")
+            p.stop()
+            b.move(int(guess)-1, 'b')
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        p.stop()
@@ -0,0 +1,215 @@
+# mancala_batch.py
+# Batched mancala move kernel (NumPy).
+
+import random, time
+
+import numpy as np
+
+from mancala import Board
+
+# Column layout of a batch state: the 12 holes, then the 'a' and 'b' stores.
+A_STORE = 12
+B_STORE = 13
+NUM_COLUMNS = 14
+
+# Turn values used by the kernel ('a' is 0, 'b' is 1).
+TURN_A = 0
+TURN_B = 1
+
+
+def from_boards(boards):
+
+    """Pack a list of boards into a batch state array."""
+
+    states = np.empty((len(boards), NUM_COLUMNS), dtype=np.int32)
+    for i, board in enumerate(boards):
+        states[i, :12] = board.holes
+        states[i, A_STORE] = board.a
+        states[i, B_STORE] = board.b
+    return states
+
+
+def to_boards(states):
+
+    """Unpack a batch state array into a list of boards."""
+
+    return [Board(int(row[A_STORE]), int(row[B_STORE]), [int(h) for h in row[:12]]) \
+            for row in states]
+
+
+def to_turns(turns):
+
+    """Convert a sequence of 'a'/'b' turns into a kernel turn array."""
+
+    return np.array([TURN_A if turn == 'a' else TURN_B for turn in turns], dtype=np.int32)
+
+
+def batch_move(states, holes, turns):
+
+    """Make one move on every board in the batch. 'states' is an (n, 14)
+       array as made by from_boards, 'holes' is the hole to move for each
+       board and 'turns' is the player for each board (TURN_A or TURN_B).
+       A negative hole (such as random_moves' -1) means no move, and leaves
+       the board untouched. Returns (new_states, again), where 'again' is
+       True for each board whose player can move again, exactly like
+       Board.move."""
+
+    states = np.array(states, dtype=np.int32, copy=True)
+    holes = np.asarray(holes, dtype=np.int64)
+    turns = np.asarray(turns, dtype=np.int64)
+    n = states.shape[0]
+
+    if (holes >= 12).any():
+        raise ValueError('holes must be below 12')
+
+    rows = np.arange(n)
+    again = np.zeros(n, dtype=bool)
+
+    # Pick up the beads. Boards moving an empty hole, or with no move, are
+    # left untouched.
+    moving = holes >= 0
+    pos = np.where(moving, holes, 0)
+    beads = np.where(moving, states[rows, pos], 0).astype(np.int64)
+    states[rows[moving], pos[moving]] = 0
+    active = beads > 0
+
+    # The store each board deposits into, and the hole it deposits after.
+    store = A_STORE + turns
+    store_hole = np.where(turns == TURN_A, 11, 5)
+
+    # Sow one bead per active board per step, until every board is done.
+    while active.any():
+        idx = np.flatnonzero(active)
+
+        # Check if we should deposit into the player's store.
+        at_store = pos[idx] == store_hole[idx]
+        if at_store.any():
+            s = idx[at_store]
+            states[s, store[s]] += 1
+            beads[s] -= 1
+
+            # Out of beads in the store, the player moves again.
+            done = s[beads[s] == 0]
+            again[done] = True
+            active[done] = False
+            idx = np.flatnonzero(active)
+
+        # Move one hole forward and deposit one bead into the hole.
+        pos[idx] = np.where(pos[idx] < 11, pos[idx] + 1, 0)
+        states[idx, pos[idx]] += 1
+        beads[idx] -= 1
+
+        # If we are out of beads, collect the current hole if it has other
+        # beads in it, otherwise the turn is over.
+        empty = idx[beads[idx] == 0]
+        collected = states[empty, pos[empty]]
+        relay = empty[collected > 1]
+        beads[relay] = states[relay, pos[relay]]
+        states[relay, pos[relay]] = 0
+        active[empty[collected <= 1]] = False
+
+    return states, again
+
+
+def random_moves(states, rng):
+
+    """Pick a random non-empty hole for each board, or -1 if every hole on
+       the board is empty."""
+
+    holes = np.full(states.shape[0], -1, dtype=np.int64)
+    for i, row in enumerate(states):
+        moves = np.flatnonzero(row[:12])
+        if len(moves):
+            holes[i] = rng.choice(moves)
+    return holes
+
+
+def verify(num_games=200, max_moves=200, seed=0):
+
+    """Play random games through both Board.move and batch_move in lockstep,
+       checking that every state and extra-turn flag matches. Returns the
+       number of moves checked."""
+
+    rng = np.random.default_rng(seed)
+    boards = [Board() for _ in range(num_games)]
+    turns = ['a'] * num_games
+    checked = 0
+
+    for _ in range(max_moves):
+        states = from_boards(boards)
+        holes = random_moves(states, rng)
+        if (holes < 0).all():
+            break
+
+        # Finished games are passed in too, to check that -1 is a no-op.
+        new_states, again = batch_move(states, holes, to_turns(turns))
+
+        for i, hole in enumerate(holes):
+            expected = boards[i].move(int(hole), turns[i]) if hole >= 0 else False
+            if not np.array_equal(from_boards([boards[i]])[0], new_states[i]) \
+                    or expected != bool(again[i]):
+                raise AssertionError(f'batch_move mismatch on game {i}: '
+                        f'move {hole} by {turns[i]}')
+            if hole >= 0:
+                if not expected:
+                    turns[i] = 'b' if turns[i] == 'a' else 'a'
+                checked += 1
+
+    return checked
+
+
+def random_positions(n, plies=6, seed=0):
+
+    """Generate 'n' positions by playing a few random plies from the start."""
+
+    rnd = random.Random(seed)
+    boards = []
+    while len(boards) < n:
+        board = Board()
+        turn = 'a'
+        for _ in range(plies):
+            moves = [i for i, h in enumerate(board.holes) if h]
+            if not moves:
+                break
+            if not board.move(rnd.choice(moves), turn):
+                turn = 'b' if turn == 'a' else 'a'
+        boards.append(board)
+    return boards
+
+
+def benchmark(batch_size=10000, repeat=5, seed=0):
+
+    """Benchmark batch_move against Board.move, returning moves/sec for each."""
+
+    rng = np.random.default_rng(seed)
+    boards = random_positions(batch_size, seed=seed)
+    states = from_boards(boards)
+    holes = random_moves(states, rng)
+    holes[holes < 0] = 0
+    turns = rng.integers(0, 2, size=batch_size)
+
+    # Time the batched kernel.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch_move(states, holes, turns)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    batch_rate = batch_size / best
+
+    # Time the pure Python move on the same positions.
+    player = ['a', 'b']
+    start = time.perf_counter()
+    for board, hole, turn in zip(to_boards(states), holes, turns):
+        board.move(int(hole), player[turn])
+    python_rate = batch_size / (time.perf_counter() - start)
+
+    return batch_rate, python_rate
+
+
+if __name__ == '__main__':
+    print(f'Verified {verify()} moves against Board.move.')
+    for size in (1000, 10000, 100000):
+        batch_rate, python_rate = benchmark(size)
+        print(f'Batch of {size}: {batch_rate:,.0f} moves/sec '
+              f'(Board.move: {python_rate:,.0f} moves/sec)')
@@ -0,0 +1,359 @@
+# mancala_mcts.py
+# Monte-Carlo tree search algorithm for mancala.
+
+import math, random, time
+from array import array
+
+from mancala import Board
+
+# Player values stored in the tree ('a' is 0, 'b' is 1).
+PLAYERS = ('a', 'b')
+
+
+class Tree:
+
+    """An array-backed search tree. Each node is a row across the arrays
+       below, and a node's children are stored next to each other, starting
+       at 'first_child'."""
+
+    def __init__(self):
+
+        """Create an empty tree."""
+
+        self.parent = array('i')
+        self.move = array('b')
+        self.to_move = array('b')
+        self.first_child = array('i')
+        self.num_children = array('b')
+        self.visits = array('i')
+        self.wins = array('d')
+
+    def __len__(self):
+
+        """Get the number of nodes in the tree."""
+
+        return len(self.parent)
+
+    def add(self, parent, move, to_move):
+
+        """Add an unexpanded node, returning its index."""
+
+        self.parent.append(parent)
+        self.move.append(move)
+        self.to_move.append(to_move)
+        self.first_child.append(-1)
+        self.num_children.append(0)
+        self.visits.append(0)
+        self.wins.append(0.0)
+        return len(self.parent) - 1
+
+    def children(self, node):
+
+        """Get the range of a node's children."""
+
+        first = self.first_child[node]
+        return range(first, first + self.num_children[node])
+
+    def bytes_per_node(self):
+
+        """Get the number of bytes each node takes up."""
+
+        return sum(a.itemsize for a in (self.parent, self.move, self.to_move, \
+                self.first_child, self.num_children, self.visits, self.wins))
+
+    def memory(self):
+
+        """Get the number of bytes the tree takes up."""
+
+        return len(self) * self.bytes_per_node()
+
+    def subtree(self, node):
+
+        """Copy the subtree under 'node' into a new tree, with 'node' as the
+           new root."""
+
+        tree = Tree()
+        tree.add(-1, self.move[node], self.to_move[node])
+        tree.visits[0] = self.visits[node]
+        tree.wins[0] = self.wins[node]
+
+        # Copy the nodes breadth-first, so children stay next to each other.
+        queue = [(node, 0)]
+        for old, new in queue:
+            if self.first_child[old] == -1:
+                continue
+
+            tree.first_child[new] = len(tree)
+            tree.num_children[new] = self.num_children[old]
+            for child in self.children(old):
+                index = tree.add(new, self.move[child], self.to_move[child])
+                tree.visits[index] = self.visits[child]
+                tree.wins[index] = self.wins[child]
+                queue.append((child, index))
+
+        return tree
+
+
+def find_all_moves(board):
+
+    """Find all moves, given a board."""
+
+    return [move for move, hole in enumerate(board.holes) if hole]
+
+
+def extra_turn_moves(board, turn):
+
+    """Find the moves whose last bead lands straight in the player's store."""
+
+    store_hole = 11 if turn == 'a' else 5
+    return [move for move, hole in enumerate(board.holes) \
+            if hole and hole == (store_hole - move) % 12 + 1]
+
+
+class MCTSComputer:
+
+    """The mancala Monte-Carlo tree search algorithm."""
+
+    def __init__(self, player, playouts=1000, time_limit=None, exploration=1.4, \
+            playout='random', max_playout_moves=200, reuse_depth=6, seed=None, stats=None):
+
+        """Create the computer. 'player' determines the player the computer
+           should calculate for, can be 'a' or 'b'. Each search runs
+           'playouts' playouts, or stops early once 'time_limit' seconds have
+           passed. 'playout' can be 'random' or 'greedy' (prefer moves which
+           give an extra turn). If 'stats' is a SearchStats, each search
+           fills it in."""
+
+        if playout not in ('random', 'greedy'):
+            raise ValueError(f'unknown playout policy: {playout}')
+
+        self.player = player
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.playout = playout
+        self.max_playout_moves = max_playout_moves
+        self.reuse_depth = reuse_depth
+        self.random = random.Random(seed)
+        self.stats = stats
+
+        self.tree = None
+        self.root_board = None
+
+        # Statistics from the last search.
+        self.last_playouts = 0
+        self.last_time = 0.0
+        self.reused_nodes = 0
+
+    @property
+    def playouts_per_sec(self):
+
+        """Get the playout rate of the last search."""
+
+        return self.last_playouts / self.last_time if self.last_time else 0.0
+
+    def bytes_per_node(self):
+
+        """Get the number of bytes each tree node takes up."""
+
+        return (self.tree or Tree()).bytes_per_node()
+
+    def calculate(self, board):
+
+        """Calculate a move, given a board."""
+
+        if self.stats is not None:
+            self.stats.begin('mancala.mcts')
+
+        start = time.perf_counter()
+        deadline = start + self.time_limit if self.time_limit else None
+        count = 0
+        try:
+            self.reuse_tree(board)
+
+            # Expand the root straight away, so there is always a move to
+            # pick even if no playouts finish.
+            if self.tree.first_child[0] == -1:
+                self.expand(0, self.root_board)
+
+            # Run the playouts.
+            while count < self.playouts:
+                if deadline and time.perf_counter() >= deadline:
+                    break
+                self.iterate()
+                count += 1
+        finally:
+            self.last_playouts = count
+            self.last_time = time.perf_counter() - start
+            if self.stats is not None:
+                self.stats.simulations = count
+                self.stats.end()
+
+        # Pick the most visited move.
+        tree = self.tree
+        children = tree.children(0)
+        if not children:
+            return None
+        return tree.move[max(children, key=lambda c: tree.visits[c])]
+
+    def reuse_tree(self, board):
+
+        """Make the tree's root match the board, keeping the subtree of the
+           previous search which leads to it if there is one."""
+
+        key = (board.a, board.b, board.holes)
+        turn = PLAYERS.index(self.player)
+
+        if self.tree is not None:
+            # Look for the board among the previous tree's nodes, replaying
+            # the moves from the old root.
+            tree = self.tree
+            queue = [(0, self.root_board, 0)]
+            for node, node_board, depth in queue:
+                if tree.to_move[node] == turn and \
+                        (node_board.a, node_board.b, node_board.holes) == key:
+                    self.tree = tree.subtree(node)
+                    self.root_board = board.dup()
+                    self.reused_nodes = len(self.tree)
+                    return
+
+                if depth == self.reuse_depth:
+                    continue
+                for child in tree.children(node):
+                    child_board = node_board.dup()
+                    child_board.move(tree.move[child], PLAYERS[tree.to_move[node]])
+                    queue.append((child, child_board, depth + 1))
+
+        # Start a new tree.
+        self.tree = Tree()
+        self.tree.add(-1, -1, turn)
+        self.root_board = board.dup()
+        self.reused_nodes = 0
+
+    def iterate(self):
+
+        """Run one selection, expansion, playout and backpropagation step."""
+
+        tree = self.tree
+        board = self.root_board.dup()
+        node = 0
+        depth = 0
+
+        # Select a leaf, following the best child by UCT.
+        while tree.first_child[node] != -1 and tree.num_children[node]:
+            node = self.select(node)
+            board.move(tree.move[node], PLAYERS[tree.to_move[tree.parent[node]]])
+            depth += 1
+
+        if self.stats is not None:
+            self.stats.nodes += depth + 1
+            if depth > self.stats.depth:
+                self.stats.depth = depth
+
+        # Expand the leaf once it has been visited, and step into a child.
+        if tree.visits[node] and tree.first_child[node] == -1:
+            self.expand(node, board)
+            if tree.num_children[node]:
+                node = tree.first_child[node] + self.random.randrange(tree.num_children[node])
+                board.move(tree.move[node], PLAYERS[tree.to_move[tree.parent[node]]])
+
+        # Play out the rest of the game.
+        result = self.simulate(board, PLAYERS[tree.to_move[node]])
+
+        # Update the nodes along the path. Each node keeps the wins for the
+        # player who moved into it.
+        while node != -1:
+            parent = tree.parent[node]
+            tree.visits[node] += 1
+            if parent != -1:
+                tree.wins[node] += result if tree.to_move[parent] == 0 else 1.0 - result
+            node = parent
+
+    def select(self, node):
+
+        """Select the child of a node with the best UCT score."""
+
+        tree = self.tree
+        log_visits = math.log(tree.visits[node] or 1)
+        best = None
+        best_score = None
+        for child in tree.children(node):
+            visits = tree.visits[child]
+            if not visits:
+                return child
+            score = tree.wins[child] / visits + \
+                    self.exploration * math.sqrt(log_visits / visits)
+            if best is None or score > best_score:
+                best = child
+                best_score = score
+        return best
+
+    def expand(self, node, board):
+
+        """Add a child for each move from the node."""
+
+        tree = self.tree
+        to_move = PLAYERS[tree.to_move[node]]
+        moves = find_all_moves(board)
+
+        # Children have to be added together, so work out who moves next
+        # first.
+        next_turns = []
+        for move in moves:
+            if board.dup().move(move, to_move):
+                next_turns.append(tree.to_move[node])
+            else:
+                next_turns.append(1 - tree.to_move[node])
+
+        tree.first_child[node] = len(tree)
+        tree.num_children[node] = len(moves)
+        for move, next_turn in zip(moves, next_turns):
+            tree.add(node, move, next_turn)
+
+    def simulate(self, board, turn):
+
+        """Play random moves until the game ends, returning 1 if 'a' wins,
+           0 if 'b' wins and 0.5 for a draw."""
+
+        board = board.dup()
+        choice = self.random.choice
+        for _ in range(self.max_playout_moves):
+            moves = None
+            if self.playout == 'greedy':
+                moves = extra_turn_moves(board, turn)
+            if not moves:
+                moves = find_all_moves(board)
+                if not moves:
+                    break
+
+            if not board.move(choice(moves), turn):
+                turn = 'b' if turn == 'a' else 'a'
+
+        if board.a > board.b:
+            return 1.0
+        elif board.a < board.b:
+            return 0.0
+        return 0.5
+
+
+if __name__ == '__main__':
+    from mancala import print_board
+
+    b = Board()
+    c = MCTSComputer('a', playouts=2000, seed=0)
+    opponent = random.Random(0)
+    for _ in range(3):
+        # Make the computer moves, including any extra turns.
+        again = True
+        while again and find_all_moves(b):
+            move = c.calculate(b)
+            print(f'Move {move + 1}: {c.last_playouts} playouts, '
+                  f'{c.playouts_per_sec:,.0f} playouts/sec, {len(c.tree)} nodes '
+                  f'({c.reused_nodes} reused, {c.bytes_per_node()} bytes/node)')
+            again = b.move(move, 'a')
+
+        # Make random opponent moves.
+        again = True
+        while again and find_all_moves(b):
+            again = b.move(opponent.choice(find_all_moves(b)), 'b')
+        print_board(b)
@@ -0,0 +1,289 @@
+# mancala_records.py
+# Binary mancala game records and a streaming analysis pipeline.
+
+import argparse, collections, itertools, multiprocessing, random, struct
+
+from mancala import Board, Computer
+
+# A record file starts with the magic and the format version.
+MAGIC = b'MNCL'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+
+# Each game starts with its number of moves and starting board (the 'a'
+# store, the 'b' store and the 12 holes), followed by one byte per move.
+GAME_HEADER = struct.Struct('<H14B')
+
+# A move byte holds the hole in the low bits, and this bit if 'b' moved.
+TURN_B_BIT = 0x80
+
+
+def encode_move(hole, turn):
+
+    """Encode a move as a byte."""
+
+    return hole | TURN_B_BIT if turn == 'b' else hole
+
+
+def decode_move(byte):
+
+    """Decode a move byte into a (hole, turn) tuple."""
+
+    return byte & ~TURN_B_BIT, 'b' if byte & TURN_B_BIT else 'a'
+
+
+class RecordWriter:
+
+    """Writes games to a record file, one at a time."""
+
+    def __init__(self, path):
+
+        """Create the writer, and write the file header."""
+
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.games = 0
+
+    def write_game(self, moves, board=None):
+
+        """Write a game. 'moves' is a list of (hole, turn) tuples and 'board'
+           is the starting board, which defaults to a new board."""
+
+        board = board or Board()
+        self.file.write(GAME_HEADER.pack(len(moves), board.a, board.b, *board.holes))
+        self.file.write(bytes(encode_move(hole, turn) for hole, turn in moves))
+        self.games += 1
+
+    def close(self):
+
+        """Close the file."""
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_games(path):
+
+    """Read the games in a record file, yielding a (board, moves) tuple for
+       each. Moves are left as the raw move bytes."""
+
+    with open(path, 'rb') as f:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a mancala record file')
+        if version != VERSION:
+            raise ValueError(f'unsupported record version: {version}')
+
+        while True:
+            header = f.read(GAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < GAME_HEADER.size:
+                raise ValueError(f'{path} ends in the middle of a game')
+
+            num_moves, a, b, *holes = GAME_HEADER.unpack(header)
+            moves = f.read(num_moves)
+            if len(moves) < num_moves:
+                raise ValueError(f'{path} ends in the middle of a game')
+            yield Board(a, b, holes), moves
+
+
+def replay(board, moves):
+
+    """Replay a game, yielding a (board, hole, turn) tuple for each move,
+       where 'board' is the board before the move."""
+
+    board = board.dup()
+    for byte in moves:
+        hole, turn = decode_move(byte)
+        yield board.dup(), hole, turn
+        board.move(hole, turn)
+
+
+def result(board, moves):
+
+    """Get the final 'a' store minus the final 'b' store of a game."""
+
+    board = board.dup()
+    for byte in moves:
+        board.move(*decode_move(byte))
+    return board.a - board.b
+
+
+def annotate_game(board, moves, limit=1, max_extra_turns=2):
+
+    """Annotate each move of a game with the engine's evaluation. Returns a
+       list of (turn, played score, best score) tuples, with scores from the
+       moving player's side."""
+
+    computers = {turn: Computer(turn, cache={}, max_extra_turns=max_extra_turns) \
+            for turn in 'ab'}
+    annotations = []
+    for position, hole, turn in replay(board, moves):
+        scores = computers[turn].calculate_scores(position, limit)
+        annotations.append((turn, scores.get(hole), max(scores.values(), default=None)))
+    return annotations
+
+
+def annotate_chunk(args):
+
+    """Annotate a chunk of games, in a worker process."""
+
+    chunk, limit, max_extra_turns = args
+    return [(moves, annotate_game(board, moves, limit, max_extra_turns), result(board, moves)) \
+            for board, moves in chunk]
+
+
+def chunked(iterable, size):
+
+    """Split an iterable into lists of up to 'size' items."""
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def annotate(games, processes=None, chunk_size=64, limit=1, max_extra_turns=2):
+
+    """Annotate games in parallel, yielding a (moves, annotations, result)
+       tuple for each game, in order. Only a few chunks are read ahead of
+       the results, so the games can be a stream of any length."""
+
+    with multiprocessing.Pool(processes) as pool:
+        pending = collections.deque()
+        max_pending = 2 * (processes or multiprocessing.cpu_count())
+
+        for chunk in chunked(games, chunk_size):
+            pending.append(pool.apply_async(annotate_chunk, \
+                    ((chunk, limit, max_extra_turns),)))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+
+        while pending:
+            yield from pending.popleft().get()
+
+
+class Statistics:
+
+    """Statistics aggregated over annotated games."""
+
+    def __init__(self, blunder_threshold=5, opening_plies=2):
+
+        """Create the statistics. A move that scores 'blunder_threshold' or
+           more below the best move is a blunder."""
+
+        self.blunder_threshold = blunder_threshold
+        self.opening_plies = opening_plies
+
+        self.games = 0
+        self.positions = 0
+        self.total_loss = {'a': 0, 'b': 0}
+        self.moves = {'a': 0, 'b': 0}
+        self.blunders = {'a': 0, 'b': 0}
+        self.openings = collections.defaultdict(lambda: [0, 0, 0])
+
+    def add(self, moves, annotations, outcome):
+
+        """Add an annotated game. 'outcome' is the final 'a' store minus the
+           final 'b' store."""
+
+        self.games += 1
+        for turn, played, best in annotations:
+            self.positions += 1
+            if played is None:
+                continue
+
+            loss = best - played
+            self.moves[turn] += 1
+            self.total_loss[turn] += loss
+            if loss >= self.blunder_threshold:
+                self.blunders[turn] += 1
+
+        # Count a win for 'a', a draw or a win for 'b' under the opening.
+        opening = tuple(decode_move(byte)[0] + 1 for byte in moves[:self.opening_plies])
+        self.openings[opening][0 if outcome > 0 else 1 if outcome == 0 else 2] += 1
+
+    def summary(self):
+
+        """Get a summary of the statistics."""
+
+        return {
+            'games': self.games,
+            'positions': self.positions,
+            'blunders': dict(self.blunders),
+            'mean_loss': {turn: self.total_loss[turn] / self.moves[turn] if self.moves[turn] else 0.0 \
+                    for turn in 'ab'},
+            'openings': {' '.join(map(str, k)): v for k, v in sorted(self.openings.items(), \
+                    key=lambda x: sum(x[1]), reverse=True)},
+        }
+
+
+def analyze(path, processes=None, chunk_size=64, limit=1, max_extra_turns=2, \
+        blunder_threshold=5, opening_plies=2):
+
+    """Annotate every game in a record file and aggregate the statistics."""
+
+    stats = Statistics(blunder_threshold, opening_plies)
+    for game in annotate(read_games(path), processes, chunk_size, limit, max_extra_turns):
+        stats.add(*game)
+    return stats
+
+
+def generate(path, num_games, max_moves=300, seed=0):
+
+    """Write a file of random games, for testing the pipeline."""
+
+    rnd = random.Random(seed)
+    with RecordWriter(path) as writer:
+        for _ in range(num_games):
+            board = Board()
+            turn = 'a'
+            moves = []
+            while len(moves) < max_moves:
+                holes = [move for move, hole in enumerate(board.holes) if hole]
+                if not holes:
+                    break
+                move = rnd.choice(holes)
+                moves.append((move, turn))
+                if not board.move(move, turn):
+                    turn = 'b' if turn == 'a' else 'a'
+            writer.write_game(moves)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mancala game records.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='write random games')
+    generate_parser.add_argument('path')
+    generate_parser.add_argument('--games', type=int, default=1000)
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    analyze_parser = subparsers.add_parser('analyze', help='annotate and summarize games')
+    analyze_parser.add_argument('path')
+    analyze_parser.add_argument('--processes', type=int, default=None)
+    analyze_parser.add_argument('--chunk-size', type=int, default=64)
+    analyze_parser.add_argument('--limit', type=int, default=1)
+    analyze_parser.add_argument('--blunder-threshold', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate(args.path, args.games, seed=args.seed)
+    else:
+        summary = analyze(args.path, args.processes, args.chunk_size, args.limit, \
+                blunder_threshold=args.blunder_threshold).summary()
+        print(f"{summary['games']} games, {summary['positions']} positions")
+        for turn in 'ab':
+            print(f"{turn}: {summary['blunders'][turn]} blunders, "
+                  f"mean loss {summary['mean_loss'][turn]:.2f}")
+        print('Most common openings (a wins, draws, b wins):')
+        for opening, counts in itertools.islice(summary['openings'].items(), 10):
+            print(f'  {opening}: {counts}')
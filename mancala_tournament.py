@@ -0,0 +1,354 @@
+# mancala_tournament.py
+# Headless round-robin tournament between mancala engines.
+
+import argparse, contextlib, itertools, json, math, multiprocessing, random, time
+
+from mancala import Board, Computer
+from mancala_mcts import MCTSComputer, find_all_moves
+from mancala_records import RecordWriter
+
+# Engine settings, used when a spec leaves them out.
+ENGINE_DEFAULTS = {
+    'minimax': {'limit': 2, 'max_extra_turns': 2},
+    'mcts': {'playouts': 500},
+    'random': {},
+}
+
+# The options each engine accepts in its spec, and their types.
+ENGINE_OPTIONS = {
+    'minimax': {'limit': int, 'max_extra_turns': int, 'time_limit': float},
+    'mcts': {'playouts': int, 'time_limit': float, 'exploration': float, 'playout': str, \
+            'max_playout_moves': int, 'reuse_depth': int},
+    'random': {},
+}
+
+DEFAULT_ENGINES = ['minimax:limit=1', 'minimax:limit=2', 'mcts:playouts=300', 'random']
+
+
+def parse_engine(spec):
+
+    """Parse an engine spec such as 'minimax:limit=4,time_limit=0.05' or
+       'mcts:playouts=500,playout=greedy' into a config dict. Raises
+       ValueError if the spec isn't valid."""
+
+    kind, _, options = spec.partition(':')
+    if kind not in ENGINE_DEFAULTS:
+        raise ValueError(f'unknown engine: {kind}')
+
+    config = {'name': spec, 'engine': kind}
+    config.update(ENGINE_DEFAULTS[kind])
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key not in ENGINE_OPTIONS[kind]:
+            raise ValueError(f'unknown option for {kind}: {key}')
+        config[key] = ENGINE_OPTIONS[kind][key](value)
+
+    # Create the engine once, so bad values are caught before any games.
+    make_engine(config, 'a', 0)
+    return config
+
+
+class RandomComputer:
+
+    """Plays a random move, as a baseline for the other engines."""
+
+    def __init__(self, player, seed=None):
+
+        """Create the computer."""
+
+        self.player = player
+        self.random = random.Random(seed)
+
+    def calculate(self, board):
+
+        """Calculate a move, given a board."""
+
+        return self.random.choice(find_all_moves(board))
+
+
+class MinimaxComputer:
+
+    """Wraps Computer so it can be played without printing its scores."""
+
+    def __init__(self, player, limit, max_extra_turns, time_limit=None):
+
+        """Create the computer."""
+
+        self.limit = limit
+        self.time_limit = time_limit
+        self.computer = Computer(player, cache={}, max_extra_turns=max_extra_turns)
+
+    def calculate(self, board):
+
+        """Calculate a move, given a board."""
+
+        return self.computer.best_move(board, self.limit, self.time_limit)
+
+
+def make_engine(config, player, seed):
+
+    """Create an engine for a player from its config."""
+
+    if config['engine'] == 'minimax':
+        return MinimaxComputer(player, config['limit'], config['max_extra_turns'], \
+                config.get('time_limit'))
+    elif config['engine'] == 'mcts':
+        options = {k: v for k, v in config.items() if k not in ('name', 'engine')}
+        return MCTSComputer(player, seed=seed, **options)
+    return RandomComputer(player, seed)
+
+
+def play_game(task):
+
+    """Play one game, returning its record. 'task' is a tuple of the game
+       number, the configs playing 'a' and 'b', the opening moves, the seed
+       and the maximum number of moves. If an engine returns an illegal move,
+       a random legal move is played for it instead, and counted in the
+       record's 'illegal'."""
+
+    game, config_a, config_b, opening, seed, max_moves = task
+    engines = {'a': make_engine(config_a, 'a', seed), 'b': make_engine(config_b, 'b', seed + 1)}
+    rnd = random.Random(seed)
+
+    board = Board()
+    turn = 'a'
+    moves = []
+    times = []
+    illegal = {'a': 0, 'b': 0}
+
+    # Play the opening moves.
+    for move in opening:
+        moves.append((move, turn))
+        if not board.move(move, turn):
+            turn = 'b' if turn == 'a' else 'a'
+
+    # Let the engines play the rest of the game.
+    start = time.perf_counter()
+    while len(moves) < max_moves and find_all_moves(board):
+        move_start = time.perf_counter()
+        move = engines[turn].calculate(board)
+        times.append((turn, time.perf_counter() - move_start))
+
+        legal = find_all_moves(board)
+        if move not in legal:
+            illegal[turn] += 1
+            move = rnd.choice(legal)
+
+        moves.append((move, turn))
+        if not board.move(move, turn):
+            turn = 'b' if turn == 'a' else 'a'
+
+    if board.a > board.b:
+        score = 1.0
+    elif board.a < board.b:
+        score = 0.0
+    else:
+        score = 0.5
+
+    return {
+        'game': game,
+        'a': config_a['name'],
+        'b': config_b['name'],
+        'opening': len(opening),
+        'moves': moves,
+        'times': times,
+        'illegal': illegal,
+        'stores': (board.a, board.b),
+        'score': score,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def random_opening(rnd, plies):
+
+    """Generate random opening moves, replaying them to keep them legal."""
+
+    board = Board()
+    turn = 'a'
+    opening = []
+    for _ in range(plies):
+        moves = find_all_moves(board)
+        if not moves:
+            break
+        move = rnd.choice(moves)
+        opening.append(move)
+        if not board.move(move, turn):
+            turn = 'b' if turn == 'a' else 'a'
+    return opening
+
+
+def schedule(configs, rounds, opening_plies, seed, max_moves):
+
+    """Create the round-robin game tasks. Each pair of engines plays every
+       opening twice, once with each colour."""
+
+    rnd = random.Random(seed)
+    tasks = []
+    for first, second in itertools.combinations(configs, 2):
+        for _ in range(rounds):
+            opening = random_opening(rnd, opening_plies)
+            game_seed = rnd.randrange(2 ** 31)
+            tasks.append((len(tasks), first, second, opening, game_seed, max_moves))
+            tasks.append((len(tasks), second, first, opening, game_seed, max_moves))
+    return tasks
+
+
+def fit_elo(names, games, iterations=100):
+
+    """Fit Elo ratings to a list of (a, b, score) results, with the mean
+       rating at 0. Each player also gets one virtual draw against a 0-rated
+       player, so an unbeaten player still gets a finite rating."""
+
+    scale = math.log(10) / 400
+    ratings = dict.fromkeys(names, 0.0)
+
+    for _ in range(iterations):
+        # Work out each player's actual and expected score.
+        actual = dict.fromkeys(names, 0.5)
+        expected = {}
+        variance = {}
+        for name in names:
+            p = 1 / (1 + math.exp(scale * ratings[name]))
+            expected[name] = 1 - p
+            variance[name] = p * (1 - p)
+
+        for a, b, score in games:
+            p = 1 / (1 + math.exp(scale * (ratings[b] - ratings[a])))
+            actual[a] += score
+            actual[b] += 1 - score
+            expected[a] += p
+            expected[b] += 1 - p
+            variance[a] += p * (1 - p)
+            variance[b] += p * (1 - p)
+
+        # Take a Newton step for each player.
+        for name in names:
+            ratings[name] += (actual[name] - expected[name]) / (scale * variance[name])
+
+        mean = sum(ratings.values()) / len(ratings)
+        for name in names:
+            ratings[name] -= mean
+
+    return ratings
+
+
+def elo_intervals(names, games, samples=200, seed=0):
+
+    """Get a 95% interval for each player's Elo, by refitting on games
+       resampled with replacement."""
+
+    rnd = random.Random(seed)
+    fits = {name: [] for name in names}
+    for _ in range(samples):
+        resample = [rnd.choice(games) for _ in games]
+        for name, rating in fit_elo(names, resample, iterations=30).items():
+            fits[name].append(rating)
+
+    return {name: (percentile(r, 2.5), percentile(r, 97.5)) for name, r in fits.items()}
+
+
+def percentile(values, p):
+
+    """Get the p-th percentile of a list of values."""
+
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    low = math.floor(k)
+    high = math.ceil(k)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def run(configs, rounds=4, opening_plies=4, processes=None, output='tournament.jsonl', \
+        seed=0, max_moves=300, records=None):
+
+    """Run the tournament, streaming each game record to 'output' as a line
+       of JSON, and to the binary record file 'records' if given. Returns a
+       summary of the results."""
+
+    names = [config['name'] for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError('each engine must have a different spec')
+
+    tasks = schedule(configs, rounds, opening_plies, seed, max_moves)
+    results = []
+    latencies = {name: [] for name in names}
+    illegal = dict.fromkeys(names, 0)
+
+    start = time.perf_counter()
+    with open(output, 'w') as f, \
+            (RecordWriter(records) if records else contextlib.nullcontext()) as writer, \
+            multiprocessing.Pool(processes) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            if writer:
+                writer.write_game(record['moves'])
+
+            results.append((record['a'], record['b'], record['score']))
+            for turn, seconds in record['times']:
+                latencies[record[turn]].append(seconds)
+            for turn, count in record['illegal'].items():
+                illegal[record[turn]] += count
+    elapsed = time.perf_counter() - start
+
+    ratings = fit_elo(names, results)
+    intervals = elo_intervals(names, results, seed=seed)
+    return {
+        'games': len(results),
+        'seconds': elapsed,
+        'games_per_sec': len(results) / elapsed,
+        'engines': {name: {
+            'elo': ratings[name],
+            'elo_95': intervals[name],
+            'latency_p50': percentile(latencies[name], 50),
+            'latency_p90': percentile(latencies[name], 90),
+            'latency_p99': percentile(latencies[name], 99),
+            'illegal': illegal[name],
+        } for name in names},
+    }
+
+
+def print_summary(summary):
+
+    """Print out a tournament summary."""
+
+    print(f"{summary['games']} games in {summary['seconds']:.1f}s "
+          f"({summary['games_per_sec']:.2f} games/sec)")
+    print()
+    print(f"{'engine':<30}{'elo':>8}{'95% interval':>20}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    engines = sorted(summary['engines'].items(), key=lambda x: x[1]['elo'], reverse=True)
+    for name, e in engines:
+        low, high = e['elo_95']
+        print(f"{name:<30}{e['elo']:>8.0f}{f'[{low:.0f}, {high:.0f}]':>20}"
+              f"{e['latency_p50'] * 1000:>10.2f}{e['latency_p90'] * 1000:>10.2f}"
+              f"{e['latency_p99'] * 1000:>10.2f}")
+
+    for name, e in engines:
+        if e['illegal']:
+            print(f"{name} made {e['illegal']} illegal move(s), replaced by random moves")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a mancala engine tournament.')
+    parser.add_argument('engines', nargs='*', default=DEFAULT_ENGINES, \
+            help="engine specs, e.g. 'minimax:limit=2' or 'mcts:playouts=500'")
+    parser.add_argument('--rounds', type=int, default=4, \
+            help='openings played by each pair, once with each colour')
+    parser.add_argument('--opening-plies', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-moves', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='tournament.jsonl')
+    parser.add_argument('--records', default=None, \
+            help='also write the games to this binary record file')
+    args = parser.parse_args()
+
+    try:
+        summary = run([parse_engine(spec) for spec in args.engines], args.rounds, \
+                args.opening_plies, args.processes, args.output, args.seed, args.max_moves, \
+                args.records)
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(summary)
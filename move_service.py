@@ -0,0 +1,342 @@
+# move_service.py
+# Local service answering tic-tac-toe and mancala moves over TCP.
+#
+# Clients send one JSON request per line, and get one JSON response per line:
+#
+#   {"id": 1, "game": "tictactoe", "board": [["X", null, null], ...], "player": "O"}
+#   {"id": 2, "game": "mancala", "holes": [4, ...], "a": 0, "b": 0, "player": "a",
+#    "limit": 3}
+#
+#   {"id": 1, "move": [1, 1], "depth": 9, "source": "search", "seconds": 0.01}
+#
+# 'source' is "search" for a new search, "cache" for a cached position and
+# "merged" when the request waited on an identical search already running.
+# 'depth' is the depth the search finished, which is below the requested
+# limit if the search ran out of time. Only finished searches are cached.
+
+import argparse, asyncio, collections, json, os, random, signal, statistics, time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import mancala, tictactoe
+
+DEFAULT_PORT = 8765
+
+# Mancala search settings, used when a request leaves them out.
+MANCALA_LIMIT = 3
+MANCALA_MAX_EXTRA_TURNS = 2
+
+# The deepest mancala search a request can ask for, and the time each search
+# gets. Limit 4 takes up to about 0.4s, while limit 5 takes up to about 4s
+# from early positions. The time limit only stops unusually slow searches.
+MANCALA_MAX_LIMIT = 4
+MANCALA_TIME_LIMIT = 1.0
+
+# Tic-tac-toe is always searched to the end of the game.
+TICTACTOE_LIMIT = 9
+
+# The number of beads in a mancala game.
+MANCALA_BEADS = 48
+
+# The worker's transposition table is cleared once it gets this big.
+MAX_TABLE_SIZE = 1000000
+
+# Each worker process keeps its transposition table between searches.
+worker_table = {}
+
+
+def is_count(value):
+
+    """Check if a JSON value is a bead count. JSON booleans are ints in
+       Python, so they are ruled out."""
+
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def position_key(request):
+
+    """Check a request, returning a hashable key for the position and search
+       settings, ending with the search limit. Raises ValueError if the
+       request isn't valid."""
+
+    game = request.get('game')
+    player = request.get('player')
+
+    if game == 'tictactoe':
+        board = request.get('board')
+        if not isinstance(board, list) or len(board) != 3 or \
+                any(not isinstance(row, list) or len(row) != 3 for row in board):
+            raise ValueError('board must be 3 rows of 3 tiles')
+        if any(tile not in ('X', 'O', None) for row in board for tile in row):
+            raise ValueError("tiles must be 'X', 'O' or null")
+        if player not in ('X', 'O'):
+            raise ValueError("player must be 'X' or 'O'")
+        return ('tictactoe', tuple(map(tuple, board)), player, TICTACTOE_LIMIT)
+
+    elif game == 'mancala':
+        holes = request.get('holes')
+        if not isinstance(holes, list) or len(holes) != 12 or \
+                not all(is_count(h) for h in holes):
+            raise ValueError('holes must be 12 bead counts')
+        a = request.get('a', 0)
+        b = request.get('b', 0)
+        if not is_count(a) or not is_count(b):
+            raise ValueError('stores must be bead counts')
+        if sum(holes) + a + b > MANCALA_BEADS:
+            raise ValueError(f'there can be at most {MANCALA_BEADS} beads')
+        if player not in ('a', 'b'):
+            raise ValueError("player must be 'a' or 'b'")
+        limit = request.get('limit', MANCALA_LIMIT)
+        if not isinstance(limit, int) or isinstance(limit, bool) or \
+                not 0 <= limit <= MANCALA_MAX_LIMIT:
+            raise ValueError(f'limit must be between 0 and {MANCALA_MAX_LIMIT}')
+        return ('mancala', tuple(holes), a, b, player, limit)
+
+    raise ValueError("game must be 'tictactoe' or 'mancala'")
+
+
+def init_worker():
+
+    """Set up a worker process. Ctrl-C is left to the service, which shuts
+       the workers down itself."""
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def search_move(key):
+
+    """Search for the move in a position, in a worker process. Returns the
+       move and the depth the search finished."""
+
+    global worker_table
+    if len(worker_table) > MAX_TABLE_SIZE:
+        worker_table = {}
+
+    if key[0] == 'tictactoe':
+        _, rows, player, limit = key
+        board = tictactoe.Board([list(row) for row in rows])
+        other = 'O' if player == 'X' else 'X'
+        computer = tictactoe.Computer(player, other)
+        if computer.game_over(board):
+            return None, limit
+        return list(computer.calculate_move(board, limit)), limit
+
+    _, holes, a, b, player, limit = key
+    computer = mancala.Computer(player, cache=worker_table, \
+            max_extra_turns=MANCALA_MAX_EXTRA_TURNS)
+    move = computer.best_move(mancala.Board(a, b, list(holes)), limit, MANCALA_TIME_LIMIT)
+    return move, computer.last_depth
+
+
+class MoveService:
+
+    """Answers move requests, running searches on a process pool."""
+
+    def __init__(self, processes=None, cache_size=100000):
+
+        """Create the service, keeping up to 'cache_size' positions' moves."""
+
+        self.pool = ProcessPoolExecutor(processes, initializer=init_worker)
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+        self.searches = {}
+        self.counts = collections.Counter()
+
+    async def get_move(self, key):
+
+        """Get the move for a position, returning the move, the depth it was
+           searched to and its source. A search which ran out of time before
+           reaching the key's limit isn't cached."""
+
+        # Check the cache.
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return (*self.cache[key], 'cache')
+
+        # Wait on an identical search if one is already running.
+        if key in self.searches:
+            return (*await asyncio.shield(self.searches[key]), 'merged')
+
+        loop = asyncio.get_running_loop()
+        search = loop.run_in_executor(self.pool, search_move, key)
+        self.searches[key] = search
+        try:
+            move, depth = await search
+        finally:
+            del self.searches[key]
+
+        if depth == key[-1]:
+            self.cache[key] = (move, depth)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return move, depth, 'search'
+
+    async def answer(self, line):
+
+        """Answer one request line, returning the response."""
+
+        start = time.perf_counter()
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            response['id'] = request.get('id')
+            move, depth, source = await self.get_move(position_key(request))
+            response['move'] = move
+            response['depth'] = depth
+            response['source'] = source
+            self.counts[source] += 1
+        except ValueError as e:
+            response['error'] = str(e)
+            self.counts['error'] += 1
+        except Exception as e:
+            response['error'] = f'search failed: {e!r}'
+            self.counts['error'] += 1
+        response['seconds'] = time.perf_counter() - start
+        return response
+
+    async def handle_client(self, reader, writer):
+
+        """Answer a client's requests. Requests are answered as they finish,
+           so a client can send more before the first is answered."""
+
+        async def respond(line):
+            response = await self.answer(line)
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+
+        """Serve clients until cancelled or terminated."""
+
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+        server = await asyncio.start_server(self.handle_client, host, port)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def random_request(rnd):
+
+    """Make a random move request, for the load generator."""
+
+    if rnd.random() < 0.5:
+        board = [[None] * 3 for _ in range(3)]
+        turn = 'X'
+        for _ in range(rnd.randrange(0, 5)):
+            row, col = rnd.choice([(r, c) for r in range(3) for c in range(3) if not board[r][c]])
+            board[row][col] = turn
+            turn = 'O' if turn == 'X' else 'X'
+        return {'game': 'tictactoe', 'board': board, 'player': turn}
+
+    board = mancala.Board()
+    turn = 'a'
+    for _ in range(rnd.randrange(0, 6)):
+        move = rnd.choice([i for i, h in enumerate(board.holes) if h])
+        if not board.move(move, turn):
+            turn = 'b' if turn == 'a' else 'a'
+    return {'game': 'mancala', 'holes': board.holes, 'a': board.a, 'b': board.b, 'player': turn}
+
+
+async def run_client(host, port, requests, latencies, sources):
+
+    """Send requests one at a time over one connection, recording the
+       latency and source of each response."""
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i, request in enumerate(requests):
+            start = time.perf_counter()
+            writer.write(json.dumps(dict(request, id=i)).encode() + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            sources[response.get('source', 'error')] += 1
+    finally:
+        writer.close()
+
+
+async def load(host='127.0.0.1', port=DEFAULT_PORT, clients=50, requests=20, positions=200, \
+        seed=0):
+
+    """Run 'clients' concurrent clients against the service, each sending
+       'requests' requests drawn from 'positions' random positions. Returns
+       the throughput and latency percentiles."""
+
+    rnd = random.Random(seed)
+    pool = [random_request(rnd) for _ in range(positions)]
+    latencies = []
+    sources = collections.Counter()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, [rnd.choice(pool) for _ in range(requests)], \
+            latencies, sources) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'sources': dict(sources),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tic-tac-toe and mancala move service.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='run the service')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--processes', type=int, default=None)
+    serve_parser.add_argument('--cache-size', type=int, default=100000)
+
+    load_parser = subparsers.add_parser('load', help='run the load generator')
+    load_parser.add_argument('--host', default='127.0.0.1')
+    load_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    load_parser.add_argument('--clients', type=int, default=50)
+    load_parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    load_parser.add_argument('--positions', type=int, default=200, \
+            help='number of distinct positions to draw requests from')
+    load_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(MoveService(args.processes, args.cache_size).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        result = asyncio.run(load(args.host, args.port, args.clients, args.requests, \
+                args.positions, args.seed))
+        print(f"{result['requests']} requests in {result['seconds']:.2f}s "
+              f"({result['requests_per_sec']:.0f} requests/sec)")
+        print(f"p50 {result['p50'] * 1000:.2f} ms, p99 {result['p99'] * 1000:.2f} ms")
+        print(f"sources: {result['sources']}")
@@ -0,0 +1,221 @@
+# search.py
+# Game-tree search shared by the game algorithms.
+#
+# A game plugs into the search through a state object with these methods:
+#
+#   moves()       the moves the side to move can make
+#   make(move)    make a move, returning whatever unmake() needs to undo it
+#   unmake(move, undo)
+#                 undo a move made by make()
+#   side()        the side to move (a move can keep the same side to move)
+#   key()         a hashable key for the position
+#   evaluate()    the score of the position for the side to move
+#   terminal()    True if the game is over at this position
+#
+# and optionally order(moves), returning the moves with the likely best first.
+
+import math, time
+
+# Transposition table entry flags.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Check the clock every this many nodes.
+CLOCK_INTERVAL = 1024
+
+
+class TimeUp(Exception):
+
+    """Raised inside a search when its time limit has passed, or when it has
+       been asked to stop."""
+
+
+class Search:
+
+    """A negamax search with alpha-beta pruning, a transposition table,
+       move ordering and iterative deepening.
+
+       Depth is only used up by moves which pass the turn to the other side,
+       so a move which gives an extra turn is searched at the same depth."""
+
+    def __init__(self, table=None, stats=None, stop_event=None):
+
+        """Create the search. 'table' is the transposition table, a dict
+           which can be kept between searches. If 'stats' is a SearchStats,
+           each search fills it in. If 'stop_event' is a threading.Event, a
+           search raises TimeUp soon after it is set."""
+
+        self.table = {} if table is None else table
+        self.stats = stats
+        self.stop_event = stop_event
+        self.deadline = None
+        self.clock = 0
+
+        # The deepest depth the last best_move() finished, or None.
+        self.finished_depth = None
+
+    def negamax(self, state, depth, alpha, beta, ply=0):
+
+        """Search a state to 'depth', returning its score for the side to
+           move. Scores outside alpha and beta are only bounds."""
+
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+            if ply > stats.depth:
+                stats.depth = ply
+
+        if self.deadline is not None or self.stop_event is not None:
+            self.clock += 1
+            if self.clock >= CLOCK_INTERVAL:
+                self.clock = 0
+                if self.deadline is not None and time.perf_counter() >= self.deadline:
+                    raise TimeUp()
+                if self.stop_event is not None and self.stop_event.is_set():
+                    raise TimeUp()
+
+        if depth == 0 or state.terminal():
+            return state.evaluate()
+
+        moves = state.moves()
+        if not moves:
+            return state.evaluate()
+
+        # Check the transposition table. An entry's score is only used at
+        # the same depth, so results match a plain minimax search, but its
+        # move is always tried first.
+        key = (state.key(), depth)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            flag, score, table_move = entry
+            if flag == EXACT or (flag == LOWER and score >= beta) or \
+                    (flag == UPPER and score <= alpha):
+                if stats is not None:
+                    stats.cache_hits += 1
+                return score
+        else:
+            shallower = self.table.get((key[0], depth - 1))
+            if shallower is not None:
+                table_move = shallower[2]
+        if stats is not None:
+            stats.cache_misses += 1
+
+        moves = self.order(state, moves, table_move)
+
+        original_alpha = alpha
+        best_score = -math.inf
+        best_move = None
+        side = state.side()
+        for move in moves:
+            undo = state.make(move)
+            try:
+                if state.side() == side:
+                    # Same side to move again, at the same depth.
+                    score = self.negamax(state, depth, alpha, beta, ply + 1)
+                else:
+                    score = -self.negamax(state, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                state.unmake(move, undo)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if stats is not None:
+                            stats.cutoffs += 1
+                        break
+
+        # Store the result.
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (flag, best_score, best_move)
+
+        return best_score
+
+    def order(self, state, moves, first=None):
+
+        """Order moves, with the state's ordering and 'first' at the front."""
+
+        order = getattr(state, 'order', None)
+        if order is not None:
+            moves = order(moves)
+        if first is not None and first in moves:
+            moves = [first] + [move for move in moves if move != first]
+        return moves
+
+    def root_scores(self, state, depth):
+
+        """Get the exact score of each move from a state, as a dict. The
+           root moves themselves don't use up depth."""
+
+        scores = {}
+        side = state.side()
+        for move in state.moves():
+            undo = state.make(move)
+            try:
+                if state.side() == side:
+                    scores[move] = self.negamax(state, depth, -math.inf, math.inf, 1)
+                else:
+                    scores[move] = -self.negamax(state, depth, -math.inf, math.inf, 1)
+            finally:
+                state.unmake(move, undo)
+        return scores
+
+    def root_search(self, state, depth, first=None):
+
+        """Search the root moves with alpha-beta, returning the best move
+           and its score."""
+
+        alpha = -math.inf
+        best_move = None
+        side = state.side()
+        for move in self.order(state, state.moves(), first):
+            undo = state.make(move)
+            try:
+                if state.side() == side:
+                    score = self.negamax(state, depth, alpha, math.inf, 1)
+                else:
+                    score = -self.negamax(state, depth, -math.inf, -alpha, 1)
+            finally:
+                state.unmake(move, undo)
+
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = move
+        return best_move, alpha
+
+    def best_move(self, state, depth, time_limit=None):
+
+        """Find the best move from a state, deepening one step at a time up
+           to 'depth'. If 'time_limit' is given, the search stops once it
+           has passed, returning the best move of the last finished depth,
+           which is kept in 'finished_depth'. Returns the best move and its
+           score."""
+
+        self.deadline = time.perf_counter() + time_limit if time_limit else None
+        self.clock = 0
+        self.finished_depth = None
+
+        best = (None, None)
+        try:
+            for current in range(depth + 1):
+                best = self.root_search(state, current, best[0])
+                self.finished_depth = current
+        except TimeUp:
+            pass
+        finally:
+            self.deadline = None
+
+        # Always return a move, even if the first depth wasn't finished.
+        if best[0] is None:
+            moves = state.moves()
+            best = (moves[0] if moves else None, None)
+        return best
@@ -0,0 +1,88 @@
+# stats.py
+# Search statistics shared by the game algorithms.
+
+import collections, json, time
+
+# The counters each search call fills in.
+COUNTERS = ('nodes', 'cutoffs', 'depth', 'cache_hits', 'cache_misses', 'simulations')
+
+
+class SearchStats:
+
+    """Statistics for the searches an algorithm runs. An algorithm only fills
+       these in if it was given a SearchStats, otherwise it skips them."""
+
+    def __init__(self, max_calls=1000):
+
+        """Create the statistics, keeping a record of the last 'max_calls'
+           search calls."""
+
+        self.calls = collections.deque(maxlen=max_calls)
+        self.total = dict.fromkeys(COUNTERS, 0)
+        self.total['calls'] = 0
+        self.total['seconds'] = 0.0
+        self.reset()
+
+    def reset(self):
+
+        """Reset the counters for the current call."""
+
+        self.engine = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.simulations = 0
+        self.start = None
+
+    def begin(self, engine):
+
+        """Start timing a search call by 'engine'."""
+
+        self.reset()
+        self.engine = engine
+        self.start = time.perf_counter()
+
+    def end(self):
+
+        """Finish the current search call, recording it."""
+
+        seconds = time.perf_counter() - self.start
+        call = {'engine': self.engine, 'time': time.time(), 'seconds': seconds}
+        for name in COUNTERS:
+            call[name] = getattr(self, name)
+        call['nodes_per_sec'] = self.nodes / seconds if seconds else 0.0
+        self.calls.append(call)
+
+        # Add the call to the totals. Depth is the deepest of any call.
+        for name in COUNTERS:
+            if name == 'depth':
+                self.total[name] = max(self.total[name], call[name])
+            else:
+                self.total[name] += call[name]
+        self.total['calls'] += 1
+        self.total['seconds'] += seconds
+        return call
+
+    @property
+    def last(self):
+
+        """Get the record of the last search call."""
+
+        return self.calls[-1] if self.calls else None
+
+    def totals(self):
+
+        """Get the totals over every search call."""
+
+        total = dict(self.total)
+        total['nodes_per_sec'] = total['nodes'] / total['seconds'] if total['seconds'] else 0.0
+        return total
+
+    def write_jsonl(self, f):
+
+        """Write the recorded search calls to a file, one JSON object per line."""
+
+        for call in self.calls:
+            f.write(json.dumps(call) + '\n')
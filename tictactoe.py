@@ -3,6 +3,11 @@
 
 import pygame, copy
 
+from search import Search
+
+# The order to search moves in: the center, then the corners, then the edges.
+MOVE_ORDER = [[1, 2, 1], [2, 0, 2], [1, 2, 1]]
+
 class Board:
 
     """A tic-tac-toe game board."""
@@ -72,27 +77,94 @@ class Board:
 
         return Board(copy.deepcopy(self.board))
 
+class State:
+
+    """A board and the player to move, for searching with search.Search."""
+
+    def __init__(self, board, to_move, other):
+
+        """Create the state. 'other' is the player who isn't 'to_move'. The
+           board is changed while it is searched."""
+
+        self.board = board
+        self.to_move = to_move
+        self.other = other
+
+    def moves(self):
+
+        """Find all moves."""
+
+        return [(row, col) for row in range(3) for col in range(3) \
+                if not self.board.is_set((row, col))]
+
+    def order(self, moves):
+
+        """Order moves, with the center first, then the corners."""
+
+        return sorted(moves, key=lambda pos: MOVE_ORDER[pos[0]][pos[1]])
+
+    def make(self, move):
+
+        """Make a move."""
+
+        self.board.set(move, self.to_move)
+        self.to_move, self.other = self.other, self.to_move
+
+    def unmake(self, move, undo):
+
+        """Undo a move."""
+
+        self.board.set(move, None)
+        self.to_move, self.other = self.other, self.to_move
+
+    def side(self):
+
+        """Get the player to move."""
+
+        return self.to_move
+
+    def key(self):
+
+        """Get a key for the state."""
+
+        return (tuple(map(tuple, self.board.board)), self.to_move)
+
+    def evaluate(self):
+
+        """Get the score for the player to move. A win scores higher the
+           fewer tiles it took."""
+
+        if self.board.has_won(self.other):
+            return self.tiles() - 20
+        elif self.board.has_won(self.to_move):
+            return 20 - self.tiles()
+        return 0
+
+    def terminal(self):
+
+        """Check if the game has ended."""
+
+        return self.board.has_won(self.other) or self.board.has_won(self.to_move) \
+                or self.board.has_tie()
+
+    def tiles(self):
+
+        """Count the tiles which have been set."""
+
+        return sum(1 for row in self.board.board for tile in row if tile)
+
 class Computer:
 
     """The computer algorithm."""
 
-    def __init__(self, computer, player):
+    def __init__(self, computer, player, stats=None):
 
-        """Create the computer player."""
+        """Create the computer player. If 'stats' is a SearchStats, each
+           search fills it in."""
 
         self.computer = computer
         self.player = player
-
-    def evaluate(self, board, depth):
-
-        """Evaluate a board."""
-
-        if board.has_won(self.computer):
-            return 10-depth
-        elif board.has_won(self.player):
-            return depth-10
-        else:
-            return 0
+        self.stats = stats
 
     def game_over(self, board):
 
@@ -106,69 +178,20 @@ class Computer:
             return True
         return False
 
-    def calculate_move(self, board):
+    def calculate_move(self, board, limit=9):
 
         """Calculate the best move for the computer.."""
 
-        moves = []
-        scores = []
-        for row in range(3):
-            for col in range(3):
-                if not board.is_set((row, col)):
-                    # Evaluate this move.
-                    new_board = board.duplicate()
-                    new_board.set((row, col), self.computer)
-                    evaluation = self.minimax(new_board, self.player)
-                    moves.append((row, col))
-                    scores.append(evaluation)
-
-        return moves[scores.index(max(scores))]
-
-    def minimax(self, board, player, depth=0, limit=10):
-
-        """Recursively perform the minimax algorithm on a board, returning the final evaluation."""
-
-        # If it's already game over, we can stop.
-        if self.game_over(board):
-            evaluation = self.evaluate(board, depth)
-            # print(' ' * depth, 'Game ended:', evaluation)
-            return evaluation
-
-        if depth == limit:
-            # Evaluate the board at this position.
-            evaluation = self.evaluate(board, depth)
-            # print(' ' * depth, 'Limit reached:', evaluation)
-            return evaluation
-
-        if player == self.computer:
-            # Our turn. Pick the best move and evaluate it.
-            scores = []
-            for row in range(3):
-                for col in range(3):
-                    if not board.is_set((row, col)):
-                        # Evaluate this move.
-                        new_board = board.duplicate()
-                        new_board.set((row, col), self.computer)
-                        # print(' ' * depth, 'Move:', (row, col))
-                        evaluation = self.minimax(new_board, self.player, depth=depth+1, limit=limit)
-                        scores.append(evaluation)
-
-            # print(' ' * depth, 'Computer has chosen:', max(scores, default=-10))
-            return max(scores, default=-1)
-        elif player == self.player:
-            # Player's turn. Pick the worst move (for us) and evaluate it.
-            scores = []
-            for row in range(3):
-                for col in range(3):
-                    if not board.is_set((row, col)):
-                        # Evaluate this move.
-                        new_board = board.duplicate()
-                        new_board.set((row, col), self.player)
-                        # print(' ' * depth, 'Move:', (row, col))
-                        evaluation = self.minimax(new_board, self.computer, depth=depth+1, limit=limit)
-                        scores.append(evaluation)
-            # print(' ' * depth, 'Player has chosen:', max(scores, default=10))
-            return min(scores, default=1)
+        if self.stats is not None:
+            self.stats.begin('tictactoe.minimax')
+
+        try:
+            state = State(board.duplicate(), self.computer, self.player)
+            move, score = Search(stats=self.stats).best_move(state, limit)
+            return move
+        finally:
+            if self.stats is not None:
+                self.stats.end()
 
 class Game:
 
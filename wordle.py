@@ -123,10 +123,12 @@ class Solver:
 
     """The Wordle solver."""
 
-    def __init__(self, starting_word='reais', next_word='blahs'):
+    def __init__(self, starting_word='reais', next_word='blahs', stats=None):
 
-        """Create the Wordle solver object."""
+        """Create the Wordle solver object. If 'stats' is a SearchStats, each
+           guess calculation fills it in."""
 
+        self.stats = stats
         self.starting_word = starting_word
         self.next_word = next_word
         self.my_words = WORDLE_WORDS[:10]
@@ -141,6 +143,20 @@ class Solver:
 
         """Calculate the next guess."""
 
+        if self.stats is None:
+            return self.find_guess()
+
+        self.stats.begin('wordle.solver')
+        try:
+            self.stats.depth = self.num_guesses + 1
+            return self.find_guess()
+        finally:
+            self.stats.end()
+
+    def find_guess(self):
+
+        """Find the next guess, updating the guess history."""
+
         if self.num_guesses == 0:
             self.num_guesses += 1
             self.guesses.append(self.starting_word)
@@ -175,6 +191,9 @@ class Solver:
             if guess in self.guesses:
                 continue
 
+            if self.stats is not None:
+                self.stats.nodes += 1
+
             # print(guess)
             worst_case = 1
             for answer in WORDLE_ANSWERS:
@@ -192,6 +211,8 @@ class Solver:
                 new_solver = copy.deepcopy(self)
                 new_solver.calculate_constraints(guess, values)
                 new_solver.calculate_possible_words()
+                if self.stats is not None:
+                    self.stats.simulations += 1
 
                 if len(new_solver.possible_words) > worst_case:
                     worst_case = len(new_solver.possible_words)